@@ -1,5 +1,7 @@
 import itertools
-from typing import List, Dict, Tuple
+import math
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
 from Compare.compare import Record, MatchResult
 from collections import defaultdict
 from dataclasses import dataclass
@@ -11,23 +13,35 @@ def group_by_identifier(records: List[Record]) -> Dict[str, List[Record]]:
     """
     Groups records by JB or INV. Returns dict: {identifier: [records]}
     """
-    groups = {}
+    groups = defaultdict(list)
     for r in records:
         key = r.job or r.invoice
         if key:
-            groups.setdefault(key, []).append(r)
+            groups[key].append(r)
     return groups
 
+def unique_records(records: Iterable[Record]) -> List[Record]:
+    """
+    Returns the records with duplicate ids removed, keeping first occurrences.
+    """
+    seen = set()
+    unique = []
+    for r in records:
+        if r.id not in seen:
+            seen.add(r.id)
+            unique.append(r)
+    return unique
+
 def group_by_identifier_both(records: List[Record]) -> Dict[str, List[Record]]:
     """
     Groups records by both JB and INV.
     Returns dict: {identifier: [records]} including both keys if present.
     """
-    groups = {}
+    groups = defaultdict(list)
     for r in records:
         keys = set(filter(None, [r.job, r.invoice]))  # Get all non-empty identifiers
         for key in keys:
-            groups.setdefault(key, []).append(r)
+            groups[key].append(r)
     return groups
 
 def find_combination_entries(
@@ -59,6 +73,11 @@ def find_combination_entries(
         )
     # Now we have a list of CombinationEntry objects
     # Remove single matches back to original matches
+    # First match for each (invoice id, payment id) pair
+    match_lookup = {}
+    for match in existing_matches:
+        match_lookup.setdefault((match.record1.id, match.record2.id), match)
+
     new_combined_matches = []
     new_matches = []
     for entry in combined_matches:
@@ -66,10 +85,9 @@ def find_combination_entries(
             new_combined_matches.append(entry)
         else:
             # If the combination only has one invoice and one payment, we treat it as a match
-            for match in existing_matches:
-                if match.record1.id == entry.get_invoice_ids()[0] and match.record2.id == entry.get_payment_ids()[0]:
-                    new_matches.append(match)
-                    break  
+            match = match_lookup.get((entry.get_invoice_ids()[0], entry.get_payment_ids()[0]))
+            if match is not None:
+                new_matches.append(match)
     return new_combined_matches, new_matches
 
 def find_combination_matches(
@@ -77,49 +95,236 @@ def find_combination_matches(
     unmatched_invoices: List[Record],
     unmatched_payments: List[Record],
     tolerance: float = tolerance,
-    max_combination_size: int = 3
+    max_combination_size: int = 3,
+    consolidate: bool = False
     ) -> List[Dict]:
     """
     Finds combination matches between invoices and payments.
-    Returns distinct valid combinations without accumulating sums.
+    Returns distinct valid combinations without accumulating sums, or with
+    consolidate=True one entry per identifier covering every record that takes
+    part in any valid combination.
     """
 
-    # Combine matched + unmatched records
-    all_invoices = [m.record1 for m in existing_matches] + unmatched_invoices
-    all_payments = [m.record2 for m in existing_matches] + unmatched_payments
+    # Combine matched + unmatched records. A record can appear in several
+    # matches, so keep each one once or it gets combined with itself
+    all_invoices = unique_records(itertools.chain((m.record1 for m in existing_matches), unmatched_invoices))
+    all_payments = unique_records(itertools.chain((m.record2 for m in existing_matches), unmatched_payments))
 
     invoice_groups = group_by_identifier(all_invoices)
     payment_groups = group_by_identifier(all_payments)
 
-    combined_matches = []
+    # Compare sums as integer cents so float noise can't decide a match at the
+    # tolerance boundary (e.g. 100.10 - 99.10 > 1.0 in floating point)
+    tol_cents = to_cents(tolerance)
 
+    combined_matches = []
     for identifier, inv_group in invoice_groups.items():
-        pay_group = payment_groups.get(identifier, [])
+        pay_group = payment_groups.get(identifier)
         if not pay_group:
             continue
-
-        # Generate combinations of invoices
-        for i in range(1, min(max_combination_size, len(inv_group)) + 1):
-            for inv_combo in itertools.combinations(inv_group, i):
-                inv_sum = sum(r.amount for r in inv_combo)
-
-                # Generate combinations of payments
-                for j in range(1, min(max_combination_size, len(pay_group)) + 1):
-                    for pay_combo in itertools.combinations(pay_group, j):
-                        pay_sum = sum(r.amount for r in pay_combo)
-
-                        if abs(inv_sum - pay_sum) <= tolerance:
-                            combined_matches.append({
-                                'identifier': identifier,
-                                'invoice_ids': [r.id for r in inv_combo],
-                                'payment_ids': [r.id for r in pay_combo],
-                                'invoice_sum': inv_sum,
-                                'payment_sum': pay_sum,
-                                'difference': round(inv_sum - pay_sum, 2)
-                            })
+        group_matches = match_identifier_group(identifier, inv_group, pay_group, tol_cents,
+                                               max_combination_size, consolidate)
+        combined_matches.extend(match for match in group_matches if match)
 
     return combined_matches
 
+def match_identifier_group(
+    identifier: str,
+    inv_group: List[Record],
+    pay_group: List[Record],
+    tol_cents: int,
+    max_combination_size: int,
+    consolidate: bool = False
+    ) -> List[Dict]:
+    """
+    Finds the combination matches for one identifier's invoices and payments.
+    """
+    # Meet in the middle: enumerate each side's subset sums once, sort the
+    # payment side, and only visit payment combos inside the tolerance window
+    # of each invoice combo instead of the full cartesian product.
+    inv_range = combination_sum_range(inv_group, max_combination_size)
+    pay_range = combination_sum_range(pay_group, max_combination_size)
+    if inv_range is None or pay_range is None:
+        return []
+
+    # Only combos whose sum lands within tolerance of something the other
+    # side can reach are worth keeping
+    inv_combos = combination_sums(inv_group, max_combination_size,
+                                  pay_range[0] - tol_cents, pay_range[1] + tol_cents)
+    pay_combos = combination_sums(pay_group, max_combination_size,
+                                  inv_range[0] - tol_cents, inv_range[1] + tol_cents)
+    pay_order = sorted(range(len(pay_combos)), key=lambda k: pay_combos[k][0])
+    pay_sums = [pay_combos[k][0] for k in pay_order]
+
+    if consolidate:
+        return [consolidated_group_match(identifier, inv_group, pay_group, inv_combos,
+                                         pay_combos, pay_order, pay_sums, tol_cents)]
+
+    matches = []
+    for inv_cents, inv_combo in inv_combos:
+        lo = bisect_left(pay_sums, inv_cents - tol_cents)
+        hi = bisect_right(pay_sums, inv_cents + tol_cents)
+        if lo == hi:
+            continue
+        inv_sum = sum(r.amount for r in inv_combo)
+
+        # Keep the original enumeration order of payment combos
+        for k in sorted(pay_order[lo:hi]):
+            pay_cents, pay_combo = pay_combos[k]
+            pay_sum = sum(r.amount for r in pay_combo)
+            matches.append({
+                'identifier': identifier,
+                'invoice_ids': [r.id for r in inv_combo],
+                'payment_ids': [r.id for r in pay_combo],
+                'invoice_sum': inv_sum,
+                'payment_sum': pay_sum,
+                'difference': (inv_cents - pay_cents) / 100
+            })
+    return matches
+
+def consolidated_group_match(identifier, inv_group, pay_group, inv_combos, pay_combos, pay_order, pay_sums, tol_cents) -> Optional[Dict]:
+    """
+    Returns a single match covering every invoice and payment that appears in
+    some valid combination, without building each combination pair.
+    """
+    used_invoices = set()
+    # Difference array over the sorted payment sums marks every payment combo
+    # that falls inside at least one invoice combo's tolerance window
+    windows = [0] * (len(pay_sums) + 1)
+    for inv_cents, inv_combo in inv_combos:
+        lo = bisect_left(pay_sums, inv_cents - tol_cents)
+        hi = bisect_right(pay_sums, inv_cents + tol_cents)
+        if lo < hi:
+            used_invoices.update(id(r) for r in inv_combo)
+            windows[lo] += 1
+            windows[hi] -= 1
+    if not used_invoices:
+        return None
+
+    used_payments = set()
+    open_windows = 0
+    for pos, k in enumerate(pay_order):
+        open_windows += windows[pos]
+        if open_windows:
+            used_payments.update(id(r) for r in pay_combos[k][1])
+
+    invoices = [r for r in inv_group if id(r) in used_invoices]
+    payments = [r for r in pay_group if id(r) in used_payments]
+    inv_cents = sum(to_cents(r.amount) for r in invoices)
+    pay_cents = sum(to_cents(r.amount) for r in payments)
+    return {
+        'identifier': identifier,
+        'invoice_ids': [r.id for r in invoices],
+        'payment_ids': [r.id for r in payments],
+        'invoice_sum': sum(r.amount for r in invoices),
+        'payment_sum': sum(r.amount for r in payments),
+        'difference': (inv_cents - pay_cents) / 100
+    }
+
+def to_cents(amount: float) -> int:
+    """Converts a dollar amount to integer cents."""
+    return int(round(amount * 100))
+
+def combination_sum_range(group: List[Record], max_combination_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Returns the smallest and largest sum, in cents, that any combination of
+    1..max_combination_size records in the group can reach, or None if no record
+    has an amount.
+    """
+    cents = sorted(to_cents(r.amount) for r in group if not math.isnan(r.amount))
+    if not cents:
+        return None
+    size = min(max_combination_size, len(cents))
+    lowest = min(itertools.accumulate(cents[:size]))
+    highest = max(itertools.accumulate(reversed(cents[-size:])))
+    return lowest, highest
+
+def combination_sums(
+    group: List[Record],
+    max_combination_size: int,
+    lo: int,
+    hi: int
+    ) -> List[Tuple[int, Tuple[Record, ...]]]:
+    """
+    Returns (sum in cents, combo) for every combination of 1..max_combination_size
+    records in the group whose sum falls within [lo, hi], in itertools.combinations
+    order. Records without an amount (NaN) can never be part of a match and are
+    left out.
+    """
+    group = [r for r in group if not math.isnan(r.amount)]
+    cents = [to_cents(r.amount) for r in group]
+    max_size = min(max_combination_size, len(group))
+
+    if all(c >= 0 for c in cents):
+        summed = ((sum(cents[i] for i in combo), combo) for combo in bounded_combinations(cents, max_size, lo, hi))
+    else:
+        # Credit notes break the monotonic sums the pruning relies on
+        summed = summed_combinations(cents, max_size)
+
+    combos = []
+    for total, combo in summed:
+        if lo <= total <= hi:
+            combos.append((total, tuple(group[i] for i in combo)))
+    return combos
+
+def summed_combinations(cents: List[int], max_size: int) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+    """
+    Yields (sum, index combo) for every combination of up to max_size indexes, in
+    itertools.combinations order. Sizes up to 3 are nested loops that carry the
+    partial sum rather than re-adding every combo.
+    """
+    n = len(cents)
+    if max_size >= 1:
+        for a in range(n):
+            yield cents[a], (a,)
+    if max_size >= 2:
+        for a in range(n):
+            ca = cents[a]
+            for b in range(a + 1, n):
+                yield ca + cents[b], (a, b)
+    if max_size >= 3:
+        for a in range(n):
+            ca = cents[a]
+            for b in range(a + 1, n):
+                sab = ca + cents[b]
+                for c in range(b + 1, n):
+                    yield sab + cents[c], (a, b, c)
+    for size in range(4, max_size + 1):
+        for combo in itertools.combinations(range(n), size):
+            yield sum(cents[i] for i in combo), combo
+
+def bounded_combinations(cents: List[int], max_size: int, lo: int, hi: int) -> List[Tuple[int, ...]]:
+    """
+    Branch and bound over non-negative amounts: returns the index combinations
+    (up to max_size) that can still land in [lo, hi], sorted into
+    itertools.combinations order. Amounts are visited smallest first, so a branch
+    stops as soon as its sum passes hi and is skipped when even its largest
+    possible extension stays below lo.
+    """
+    order = sorted(range(len(cents)), key=cents.__getitem__)
+    values = [cents[i] for i in order]
+    n = len(values)
+    found = []
+
+    def extend(start, picked, running):
+        remaining = max_size - len(picked) - 1
+        for pos in range(start, n):
+            total = running + values[pos]
+            if total > hi:
+                break
+            best = total + sum(values[max(pos + 1, n - remaining):]) if remaining else total
+            if best < lo:
+                continue
+            picked.append(order[pos])
+            found.append(tuple(sorted(picked)))
+            if remaining:
+                extend(pos + 1, picked, total)
+            picked.pop()
+
+    extend(0, [], 0)
+    found.sort(key=lambda combo: (len(combo), combo))
+    return found
+
 def summarize_combined_matches(combined_matches: List[Dict]) -> None:
     """
     Prints a summary of combined matches for quick CLI inspection.
@@ -219,111 +424,67 @@ def write_reconciliation_csv(
     invoice_lookup = {r.id: r for r in all_invoices}
     payment_lookup = {r.id: r for r in all_payments}
 
+    no_invoice = no_payment = ('', '', '')
+
+    def invoice_cells(inv):
+        return (inv.date, inv.description, inv.amount) if inv else no_invoice
+
+    def payment_cells(pay):
+        return (pay.date, pay.description, pay.amount) if pay else no_payment
+
     with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = [
+        fieldnames = (
             'Invoice Date', 'Invoice Desc', 'Invoice Amount','Payment Date', 'Payment Desc', 'Payment Amount','Difference', 'Status',
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        previous_group_info = {
-            'Invoice Date': '',
-            'Invoice Desc': '',
-            'Invoice Amount': '',
-            'Payment Date': '',
-            'Payment Desc': '',
-            'Payment Amount':'' 
-            }
+        )
+        writer = csv.writer(csvfile)
+        writer.writerow(fieldnames)
+        empty_row = ('',) * len(fieldnames)
+        # Sums of the previous group match, written on the next group's line
+        previous_group_info = ('', '', '', '', '', '')
+
         for row in final_combined_rows:
-            if row['Status'] == 'SpaceHolder':
-                writer.writerow({})
+            status = row.get('Status')
+            if status == 'SpaceHolder':
+                writer.writerow(empty_row)
                 continue  # Write empty row, continue to next
 
-            output = {
-                'Status': row.get('Status'),
-                'Difference': row.get('Difference', '')
-            }
-            
+            difference = row.get('Difference', '')
+
             # === For Matches and Group Matches ===
-            if row['Status'] in ['Match', 'Group Match']:
+            if status == 'Group Match':
                 # For group match, just show combined summary
-                if row['Status'] == 'Group Match':
-                    output.update(previous_group_info)
-                    writer.writerow(output)
-                    writer.writerow({})
-
-                    previous_group_info.update({
-                        'Invoice Date': '',
-                        'Invoice Desc': '',
-                        'Invoice Amount': row.get('Invoice Sum'),
-                        'Payment Date': '',
-                        'Payment Desc': '',
-                        'Payment Amount': row.get('Payment Sum')
-                    })
-                    continue
-                else:  # One-to-one match
-
-                    inv = invoice_lookup.get(row.get('Invoice ID'))
-                    pay = payment_lookup.get(row.get('Payment ID'))
-                    output.update({
-                        'Invoice Date': inv.raw_data.get('Date') if inv else '',
-                        'Invoice Desc': inv.description if inv else '',
-                        'Invoice Amount': inv.amount if inv else '',
-                        'Payment Date': pay.raw_data.get('Date') if pay else '',
-                        'Payment Desc': pay.description if pay else '',
-                        'Payment Amount': pay.amount if pay else ''
-                    })
+                writer.writerow(previous_group_info + (difference, status))
+                writer.writerow(empty_row)
+                previous_group_info = ('', '', row.get('Invoice Sum'), '', '', row.get('Payment Sum'))
+                continue
+
+            elif status == 'Match':  # One-to-one match
+                cells = (invoice_cells(invoice_lookup.get(row.get('Invoice ID')))
+                         + payment_cells(payment_lookup.get(row.get('Payment ID'))))
 
             # === For Related Invoice ===
-            elif row['Status'] == 'Related Invoice':
-                inv = invoice_lookup.get(row.get('Invoice ID'))
-                output.update({
-                    'Invoice Date': inv.raw_data.get('Date') if inv else '',
-                    'Invoice Desc': inv.description if inv else '',
-                    'Invoice Amount': inv.amount if inv else '',
-                    'Payment Date': '',
-                    'Payment Desc': '',
-                    'Payment Amount': '',
-                    'Status': ''
-                })
+            elif status == 'Related Invoice':
+                cells = invoice_cells(invoice_lookup.get(row.get('Invoice ID'))) + no_payment
+                status = ''
 
             # === For Related Payment ===
-            elif row['Status'] == 'Related Payment':
-                pay = payment_lookup.get(row.get('Payment ID'))
-                output.update({
-                    'Invoice Date': '',
-                    'Invoice Desc': '',
-                    'Invoice Amount': '',
-                    'Payment Date': pay.raw_data.get('Date') if pay else '',
-                    'Payment Desc': pay.description if pay else '',
-                    'Payment Amount': pay.amount if pay else '',
-                    'Status': ''
-                })
+            elif status == 'Related Payment':
+                cells = no_invoice + payment_cells(payment_lookup.get(row.get('Payment ID')))
+                status = ''
 
-            elif row['Status'] == 'Unmatched Invoice':
+            elif status == 'Unmatched Invoice':
                 inv = invoice_lookup.get(row.get('Invoice ID'))
-                output.update({
-                'Invoice Amount': inv.amount,
-                'Invoice Date': inv.raw_data.get('Date'),
-                'Invoice Desc': inv.description,
-                'Payment Date': '',
-                'Payment Desc': '',
-                'Payment Amount': '',
-                'Status': '',
-                })
+                cells = (inv.date, inv.description, inv.amount) + no_payment
+                status = ''
 
-            elif row['Status'] == 'Unmatched Payment':
-                pay = payment_lookup.get(row.get('Payment ID'))
-                output.update({
-                    'Invoice Date': '',
-                    'Invoice Desc': '',
-                    'Invoice Amount': '',
-                    'Payment Date': pay.raw_data.get('Date') if pay else '',
-                    'Payment Desc': pay.description if pay else '',
-                    'Payment Amount': pay.amount if pay else '',
-                    'Status': '',
-                })
+            elif status == 'Unmatched Payment':
+                cells = no_invoice + payment_cells(payment_lookup.get(row.get('Payment ID')))
+                status = ''
+
+            else:
+                cells = no_invoice + no_payment
 
-            writer.writerow(output)
+            writer.writerow(cells + (difference, status))
 
     print(f"✅ CSV output saved to {output_file}")
 
@@ -333,7 +494,8 @@ def full_combination_flow(matches, unmatched_invoices, unmatched_payments, outpu
         unmatched_invoices=unmatched_invoices,  # your list of unmatched invoice Record objects
         unmatched_payments=unmatched_payments,  # your list of unmatched payment Record objects
         tolerance=tolerance,
-        max_combination_size=3
+        max_combination_size=3,
+        consolidate=True
     )
 
     all_invoices = [m.record1 for m in matches] + unmatched_invoices
@@ -402,7 +564,7 @@ def full_combination_flow(matches, unmatched_invoices, unmatched_payments, outpu
     # === 3. Add unmatched invoices ===
     for inv in updated_unmatched_invoices:
         output = {
-            'Invoice Date': inv.raw_data.get('Date'),
+            'Invoice Date': inv.date,
             'Invoice Desc': inv.description,
             'Invoice Amount': inv.amount,
             'Invoice ID': inv.id,
@@ -417,7 +579,7 @@ def full_combination_flow(matches, unmatched_invoices, unmatched_payments, outpu
     # === 4. Add unmatched payments ===
     for pay in updated_unmatched_payments:
         output = {
-            'Payment Date': pay.raw_data.get('Date'),
+            'Payment Date': pay.date,
             'Payment Desc': pay.description,
             'Payment Amount': pay.amount,
             'Payment ID': pay.id,
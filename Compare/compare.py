@@ -1,10 +1,15 @@
 import re, sys, os
+import csv
 import math
+import bisect
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, asdict
-from difflib import SequenceMatcher
+from dataclasses import dataclass, asdict, field
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from rapidfuzz import process
+from rapidfuzz.distance import JaroWinkler
 from dateutil import parser
 from XeroClient.xero_client import authorize_xero, get_invoices, get_creditnotes
 
@@ -51,6 +56,12 @@ property_aliases = {
     'Homestead Apartments': ['Homestead', 'Homestread', 'Homested'],
 }
 
+# Case-insensitive pattern matching any of a property's aliases
+property_alias_patterns = {
+    name: re.compile('|'.join(map(re.escape, aliases)), re.IGNORECASE)
+    for name, aliases in property_aliases.items()
+}
+
 invoice_id_col = 'InvoiceID'   # replace with your actual ID column name
 invoice_desc_col = 'Combined'
 payment_id_col = 'PaymentID'   # replace with your actual ID column name
@@ -58,11 +69,22 @@ payment_desc_col = 'Reference'
 
 pull_new_data = True
 
+# Invoices scored against every payment per batch in find_best_matches
+match_block_rows = 512
+
+number_pattern = re.compile(r'\d+')
+invoice_pattern = re.compile(r'(INV-\d+)')
+job_pattern = re.compile(r'JB[:\s]*\.?(\d+)', re.IGNORECASE)
+
+# Match confidence bands: below 0.6 is low, below 0.8 medium, otherwise high
+confidence_bounds = (0.6, 0.8)
+confidence_labels = ('low', 'medium', 'high')
+
 # ================================
 # Data Classes
 # ================================
 
-@dataclass
+@dataclass(slots=True)
 class Record:
     """Represents a data record with text and numeric components"""
     id: str
@@ -70,9 +92,17 @@ class Record:
     date: str
     amount: float
     numbers: List[str]
-    raw_data: Dict
     invoice: Optional[str] = None
     job: Optional[str] = None
+    desc_lower: str = field(init=False, repr=False)
+    desc_tokens: frozenset = field(init=False, repr=False)
+    numbers_set: frozenset = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Derived once here instead of on every comparison
+        self.desc_lower = self.description.lower()
+        self.desc_tokens = frozenset(self.desc_lower.split())
+        self.numbers_set = frozenset(self.numbers)
     
     def to_dict(self) -> Dict:
         return asdict(self)
@@ -81,7 +111,7 @@ class Record:
         """Returns a CSV representation of this record."""
         return f"{self.date},{self.description},{self.amount}" 
 
-@dataclass
+@dataclass(slots=True)
 class MatchResult:
     """Represents a match between two records"""
     record1: Record
@@ -110,15 +140,18 @@ class FuzzyMatcher:
 
     def extract_numbers(self, text: str) -> List[str]:
         """Extract numeric sequences from text"""
-        return re.findall(r'\d+', text or '')
+        return number_pattern.findall(text or '')
 
     def jaro_winkler_similarity(self, s1: str, s2: str) -> float:
         if not s1 or not s2:
             return 0.0
-        return SequenceMatcher(None, s1.lower(), s2.lower()).ratio()
+        # Jaro-Winkler similarity in [0, 1], weighting a shared prefix
+        return JaroWinkler.normalized_similarity(s1.lower(), s2.lower())
 
     def cosine_similarity(self, s1: str, s2: str) -> float:
-        words1, words2 = set(s1.lower().split()), set(s2.lower().split())
+        return self.token_cosine(set(s1.lower().split()), set(s2.lower().split()))
+
+    def token_cosine(self, words1: frozenset, words2: frozenset) -> float:
         if not words1 or not words2:
             return 0.0
         intersection = words1.intersection(words2)
@@ -129,7 +162,7 @@ class FuzzyMatcher:
         cosine = self.cosine_similarity(text1, text2)
         return (jaro + cosine) / 2
 
-    def number_similarity(self, nums1: List[str], nums2: List[str]) -> float:
+    def number_similarity(self, nums1: List[str], nums2: frozenset) -> float:
         if not nums1 or not nums2:
             return 0.0
         matches = sum(1 for n in nums1 if n in nums2)
@@ -146,25 +179,19 @@ class FuzzyMatcher:
         return min(abs1, abs2) / max(abs1, abs2)
 
     def calculate_similarity(self, r1: Record, r2: Record) -> Tuple[float, float, float, float]:
-        text_score = self.text_similarity(r1.description, r2.description)
-        number_score = self.number_similarity(r1.numbers, r2.numbers)
-        amount_score = self.amount_similarity(r1.raw_data.get('Gross', 0.0), r2.raw_data.get('Amount', 0.0))
-        if r1.invoice is not None and r2.invoice is not None:
-            if r1.invoice == r2.invoice:
-                number_score = 1.0
-        if r1.job is not None and r2.job is not None:
-            if r1.job == r2.job:
-                number_score = 1.0
+        jaro = self.jaro_winkler_similarity(r1.desc_lower, r2.desc_lower)
+        text_score = (jaro + self.token_cosine(r1.desc_tokens, r2.desc_tokens)) / 2
+        amount_score = self.amount_similarity(r1.amount, r2.amount)
+        # A shared invoice or job pins the number score, so skip the overlap count
+        if (r1.invoice is not None and r1.invoice == r2.invoice) or (r1.job is not None and r1.job == r2.job):
+            number_score = 1.0
+        else:
+            number_score = self.number_similarity(r1.numbers, r2.numbers_set)
         total_score = (text_score * self.text_weight) + (number_score * self.number_weight)+(amount_score * self.amount_weight)
         return total_score, text_score, number_score, amount_score
 
     def get_confidence(self, score: float) -> str:
-        if score >= 0.8:
-            return 'high'
-        elif score >= 0.6:
-            return 'medium'
-        else:
-            return 'low'
+        return confidence_labels[bisect.bisect_right(confidence_bounds, score)]
 
     def create_record(self, row: Dict, id_col: str, desc_col: str) -> Record:
         desc = str(row.get(desc_col, ''))
@@ -174,12 +201,12 @@ class FuzzyMatcher:
         numbers = self.extract_numbers(desc)
         invoice = self.extract_invoice(desc)
         job = self.extract_job(desc)
-        return Record(id=rec_id, description=desc, amount=amount, date=date, numbers=numbers, raw_data=row, invoice=invoice, job=job)
+        return Record(id=rec_id, description=desc, amount=amount, date=date, numbers=numbers, invoice=invoice, job=job)
 
     def extract_invoice(self, row: str) -> Optional[str]:
         """Extract invoice number from row data"""
         # This finds "INV-" followed by one or more digits
-        match = re.search(r'(INV-\d+)', row)
+        match = invoice_pattern.search(row)
         if match:
             return match.group(1)
         else:
@@ -189,50 +216,167 @@ class FuzzyMatcher:
         """Extract job number from row data"""
        # - 'JB' optionally followed by ':' and/or spaces
         # - then captures one or more digits
-        match = re.search(r'JB[:\s]*\.?(\d+)', row, re.IGNORECASE)
+        match = job_pattern.search(row)
         if match:
             return match.group(1)
         else:
             return None
     
+    def build_match_index(self, records: List[Record]) -> Dict:
+        """Precomputes the payment side of score_block: lowercased text, token and
+        number postings, identifier lookups and amounts"""
+        index = {
+            'count': len(records),
+            'lower': [r.desc_lower for r in records],
+            'empty': np.array([not r.description for r in records]),
+            'token_counts': np.zeros(len(records)),
+            'tokens': {},
+            'numbers': {},
+            'invoices': {},
+            'jobs': {},
+            'amounts': np.abs(np.array([r.amount for r in records], dtype=float)),
+        }
+        for j, r in enumerate(records):
+            index['token_counts'][j] = len(r.desc_tokens)
+            for word in r.desc_tokens:
+                index['tokens'].setdefault(word, []).append(j)
+            for n in r.numbers_set:
+                index['numbers'].setdefault(n, []).append(j)
+            if r.invoice is not None:
+                index['invoices'].setdefault(r.invoice, []).append(j)
+            if r.job is not None:
+                index['jobs'].setdefault(r.job, []).append(j)
+        for key in ('tokens', 'numbers', 'invoices', 'jobs'):
+            index[key] = {k: np.array(v) for k, v in index[key].items()}
+        # Cosine denominators: payments without words get an infinite root so
+        # their score divides out to 0
+        roots = np.sqrt(index['token_counts'])
+        roots[roots == 0] = np.inf
+        index['token_roots'] = roots
+        return index
+
+    def score_block(self, records: List[Record], index: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Matrix version of calculate_similarity for records against an indexed
+        table. Returns (total, text, number) score matrices; text scores are only
+        filled in for pairs that can reach the threshold."""
+        rows, cols = len(records), index['count']
+
+        cosine = np.zeros((rows, cols))
+        number_scores = np.zeros((rows, cols))
+        for i, r in enumerate(records):
+            words = r.desc_tokens
+            if words:
+                shared = cosine[i]
+                for word in words:
+                    postings = index['tokens'].get(word)
+                    if postings is not None:
+                        shared[postings] += 1
+                np.divide(shared, math.sqrt(len(words)) * index['token_roots'], out=shared)
+            if r.numbers:
+                found = number_scores[i]
+                for n in r.numbers:
+                    postings = index['numbers'].get(n)
+                    if postings is not None:
+                        found[postings] += 1
+                number_scores[i] = found / len(r.numbers)
+            if r.invoice is not None and r.invoice in index['invoices']:
+                number_scores[i, index['invoices'][r.invoice]] = 1.0
+            if r.job is not None and r.job in index['jobs']:
+                number_scores[i, index['jobs'][r.job]] = 1.0
+
+        # Blocking: when text and amount alone can't reach the threshold, a pair
+        # that shares no number or identifier can never match, so the text ratio
+        # is only needed for each invoice's candidates
+        if self.text_weight + self.amount_weight < self.similarity_threshold:
+            jaro = np.zeros((rows, cols))
+            for i, r in enumerate(records):
+                candidates = np.flatnonzero(number_scores[i])
+                # One query per call, and cdist only splits work across queries,
+                # so this stays single-threaded
+                if len(candidates):
+                    jaro[i, candidates] = process.cdist([r.desc_lower], [index['lower'][j] for j in candidates],
+                                                        scorer=JaroWinkler.normalized_similarity, dtype=np.float64)[0]
+        else:
+            jaro = process.cdist([r.desc_lower for r in records], index['lower'],
+                                 scorer=JaroWinkler.normalized_similarity, dtype=np.float64, workers=-1)
+        jaro[np.array([not r.description for r in records]), :] = 0.0
+        jaro[:, index['empty']] = 0.0
+        text_scores = (jaro + cosine) / 2
+
+        # Same rules as amount_similarity, including its handling of missing
+        # amounts. Built in place, with zero and missing amounts patched by
+        # row/column, to avoid extra block-sized temporaries.
+        amounts1 = np.abs(np.array([r.amount for r in records], dtype=float))
+        amounts2 = index['amounts']
+        amount_scores = np.fmin(amounts1[:, None], amounts2[None, :])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(amount_scores, np.fmax(amounts1[:, None], amounts2[None, :]), out=amount_scores)
+        amount_scores[np.isnan(amounts1), :] = np.nan
+        zero1, zero2 = amounts1 == 0, amounts2 == 0
+        amount_scores[:, zero2] = 0.0
+        amount_scores[zero1, :] = 0.0
+        amount_scores[np.ix_(zero1, zero2)] = 1.0
+
+        # (text * tw) + (number * nw) + (amount * aw), accumulated in place
+        totals = text_scores * self.text_weight
+        scratch = np.multiply(number_scores, self.number_weight)
+        totals += scratch
+        np.multiply(amount_scores, self.amount_weight, out=scratch)
+        totals += scratch
+        return totals, text_scores, number_scores
+
     def find_best_matches(self, table1: List[Record], table2: List[Record]) -> Tuple[List[MatchResult], List[Record], List[Record]]:
         """Find best matches globally between table1 and table2 with deduplication"""
 
-        potential_matches = []
         matched_invoices = set()
         matched_payments = set()
-
-        # Build list of all possible matches above threshold
-        for inv in table1:
-            
-            for pay in table2:
-                if inv.raw_data.get('Gross') < 0 and pay.raw_data.get('Amount') < 0:
-                    pass
-                score, text_score, number_score, amount_score = self.calculate_similarity(inv, pay)
-
-                if score >= self.similarity_threshold:
-                    potential_matches.append(MatchResult(
-                        record1=inv,
-                        record2=pay,
-                        similarity_score=score,
-                        text_score=text_score,
-                        number_score=number_score,
-                        confidence=self.get_confidence(score)
-                    ))
-
-        # Sort all potential matches by descending similarity score
-        potential_matches.sort(key=lambda x: x.similarity_score, reverse=True)
-
         final_matches = []
-        for match in potential_matches:
-            inv_id = match.record1.id
-            pay_id = match.record2.id
+
+        if not table1 or not table2:
+            return final_matches, list(table1), list(table2)
+
+        # Collect every pair above threshold as parallel arrays, scoring a block
+        # of invoices against every payment at once
+        index = self.build_match_index(table2)
+        candidates = []
+        for start in range(0, len(table1), match_block_rows):
+            block = table1[start:start + match_block_rows]
+            totals, text_scores, number_scores = self.score_block(block, index)
+            rows, cols = np.nonzero(totals >= self.similarity_threshold)
+            candidates.append((totals[rows, cols], (rows + start).astype(np.int32), cols.astype(np.int32),
+                               text_scores[rows, cols], number_scores[rows, cols]))
+        scores, rows, cols, text_scores, number_scores = (np.concatenate(part) for part in zip(*candidates))
+
+        # Best score first; the stable sort keeps ties in scan order
+        order = np.argsort(-scores, kind='stable')
+
+        # Greedy one-to-one assignment over candidate positions
+        accepted = []
+        for k, i, j in zip(order.tolist(), rows[order].tolist(), cols[order].tolist()):
+            inv_id = table1[i].id
+            pay_id = table2[j].id
 
             if inv_id not in matched_invoices and pay_id not in matched_payments:
-                final_matches.append(match)
+                accepted.append(k)
                 matched_invoices.add(inv_id)
                 matched_payments.add(pay_id)
 
+        # MatchResult is only built for accepted pairs, with confidence bands
+        # looked up for all of them at once
+        accepted = np.array(accepted, dtype=np.intp)
+        bands = np.searchsorted(confidence_bounds, scores[accepted], side='right')
+        for i, j, score, text_score, number_score, band in zip(
+                rows[accepted].tolist(), cols[accepted].tolist(), scores[accepted].tolist(),
+                text_scores[accepted].tolist(), number_scores[accepted].tolist(), bands.tolist()):
+            final_matches.append(MatchResult(
+                record1=table1[i],
+                record2=table2[j],
+                similarity_score=score,
+                text_score=text_score,
+                number_score=number_score,
+                confidence=confidence_labels[band]
+            ))
+
         # Identify unmatched invoices and payments
         unmatched_invoices = [inv for inv in table1 if inv.id not in matched_invoices]
         unmatched_payments = [pay for pay in table2 if pay.id not in matched_payments]
@@ -251,42 +395,51 @@ def load_table(df, id_col: str, desc_col: str) -> List[Record]:
     #    df[id_col]=str(i)
     df[id_col] = [str(i) for i in df.index]
     
-    matcher = FuzzyMatcher()
-    tmp=[]
-    for _,row in df.iterrows():
-        #print(type(row))
-        #print(row)
-        #break
-        tmp.append(matcher.create_record(row, id_col, desc_col))
-    return tmp
-    #return [matcher.create_record(row, id_col, desc_col) for _, row in df.iterrows()]
+    # Same fields create_record builds, extracted a column at a time
+    descs = pd.Series([str(d) for d in df[desc_col]] if desc_col in df else [''] * len(df), index=df.index, dtype=object)
+    amounts = column_values(df, 'Gross', 'Amount', 0.0)
+    dates = column_values(df, 'Date', 'DateString', '')
+    numbers = descs.str.findall(number_pattern).tolist()
+    invoices = descs.str.extract(invoice_pattern, expand=False)
+    jobs = descs.str.extract(job_pattern, expand=False)
+    invoices = invoices.astype(object).where(invoices.notna(), None).tolist()
+    jobs = jobs.astype(object).where(jobs.notna(), None).tolist()
+
+    return [
+        Record(id=rec_id, description=desc, amount=amount, date=date, numbers=nums, invoice=invoice, job=job)
+        for rec_id, desc, amount, date, nums, invoice, job
+        in zip(df[id_col].tolist(), descs.tolist(), amounts, dates, numbers, invoices, jobs)
+    ]
+
+def column_values(df, column: str, fallback: str, default) -> list:
+    """Values of column, else of fallback, else default for every row"""
+    for name in (column, fallback):
+        if name in df:
+            return df[name].tolist()
+    return [default] * len(df)
 
 def output_matches(matches: List[MatchResult], unmatched_invoices: List[Record], unmatched_payments: List[Record], output_path: str):
-    with open(output_path, 'w') as f:
-        f.write("Date,PMC Description,PMC Amount,Date,Property Description,Property Amount,Similarity,TextScore,NumberScore,Confidence\n")
-        inv_total= 0.0
-        pay_total = 0.0
-        for m in matches:
-            f.write(f"{m.record1.date},{m.record1.description},{m.record1.amount},"
-                    f"{m.record2.date},{m.record2.description},{m.record2.amount},"
-                    f"{m.similarity_score:.3f},{m.text_score:.3f},{m.number_score:.3f},{m.confidence}\n")
-            inv_total += m.record1.amount
-            pay_total += m.record2.amount
-        #f.write("Invoice_ID,Payment_ID,Invoice_Desc,Payment_Desc,Similarity,TextScore,NumberScore,Confidence\n")
-        #for m in matches:
-        #    f.write(f"{m.record1_id},{m.record2_id},{m.record1_desc},{m.record2_desc},"
-        #            f"{m.similarity_score:.3f},{m.text_score:.3f},{m.number_score:.3f},{m.confidence}\n")
-        # Output unmatched invoices and payments
-        f.write(f",,{inv_total:.2f},,,{pay_total:.2f},,,\n")
-        f.write('\n')
+    with open(output_path, 'w', newline='') as f:
+        # csv.writer quotes descriptions that contain commas
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'PMC Description', 'PMC Amount', 'Date', 'Property Description', 'Property Amount',
+                         'Similarity', 'TextScore', 'NumberScore', 'Confidence'])
+        writer.writerows(
+            (m.record1.date, m.record1.description, m.record1.amount,
+             m.record2.date, m.record2.description, m.record2.amount,
+             f"{m.similarity_score:.3f}", f"{m.text_score:.3f}", f"{m.number_score:.3f}", m.confidence)
+            for m in matches
+        )
+        inv_total = sum(m.record1.amount for m in matches)
+        pay_total = sum(m.record2.amount for m in matches)
+        writer.writerow(['', '', f"{inv_total:.2f}", '', '', f"{pay_total:.2f}", '', '', ''])
+        writer.writerow([])
 
         # Unmatched Invoices
-        for i in unmatched_invoices:
-            f.write(f"{i.date},{i.description},{i.amount},,,,\n")
+        writer.writerows((i.date, i.description, i.amount, '', '', '', '') for i in unmatched_invoices)
 
         # Unmatched Payments
-        for p in unmatched_payments:
-            f.write(f",,,{p.date},{p.description},{p.amount},\n")
+        writer.writerows(('', '', '', p.date, p.description, p.amount, '') for p in unmatched_payments)
 
 
     print(f"✅ Matches saved to {output_path}")
@@ -438,62 +591,43 @@ def get_test_data():
     df = pd.DataFrame(payments)
     df.to_csv('test_data_payments.csv', index=False)
 
+@lru_cache(maxsize=4096)
+def format_date(value: str) -> str:
+    """Formats a Xero date string as '01 Jul 2025'. Cached because a pull only
+    spans a handful of distinct dates."""
+    return parser.parse(value).strftime('%d %b %Y')
+
+invoice_sources = {'ACCREC': 'Recievable Invoice', 'ACCPAY': 'Payable Invoice'}
+credit_sources = {'ACCRECCREDIT': 'Recievable Credit Note', 'ACCPAYCREDIT': 'Payable Credit Note'}
+
 def pmc_data_cleanup(in_dict: list[dict]):
     ret_list = []
-    source_str=''
-    source_flag = False
-    ref_str = ''
-    inv_str= ''
-    com_flag = False
     for item in in_dict:
         new_dict = {}
         for key, value in item.items():
-            if source_flag:
-                new_dict['Source'] = source_str
-                source_flag = False
-            elif key == 'Status':
-                source_flag = True
-
-            if com_flag:
-                new_dict['Combined'] = f"{ref_str} {inv_str}"
-                com_flag = False
-                ref_str = ''
-                inv_str = ''    
-
             if key == 'DateString':
-                if value is not None:
-                    new_dict['Date'] = parser.parse(value).strftime('%d %b %Y')
-                else:
-                    new_dict['Date'] = None
+                new_dict['Date'] = format_date(value) if value is not None else None
             elif key == 'DueDateString':
-                if value is not None:
-                    new_dict['DueDate'] = parser.parse(value).strftime('%d %b %Y')
-                else:
-                    new_dict['DueDate'] = None
+                new_dict['DueDate'] = format_date(value) if value is not None else None
             elif key == 'InvoiceSent':
                 if value is None:
                     new_dict['InvoiceSent'] = "Not Sent"
                 elif value:
                     new_dict['InvoiceSent'] = "Sent"
             elif key == 'Type':
-                if value == 'ACCREC':
-                    source_str = 'Recievable Invoice'
-                elif value == 'ACCPAY':
-                    source_str = 'Payable Invoice'
                 continue
             elif key == 'Total':
                 new_dict['Gross'] = value
             elif key == 'AmountDue':
                 new_dict['Balance'] = value
             elif key == 'Reference':
-                if value is not None:
-                    ref_str = value
-                com_flag = True
                 new_dict[key] = value
-            elif key == 'InvoiceNumber':
-                if value is not None:
-                    inv_str = value
+                reference = value if value is not None else ''
+                invoice_number = item.get('InvoiceNumber')
+                new_dict['Combined'] = f"{reference} {invoice_number if invoice_number is not None else ''}"
+            elif key == 'Status':
                 new_dict[key] = value
+                new_dict['Source'] = invoice_sources.get(item.get('Type'), '')
             else:
                 new_dict[key] = value
             
@@ -502,41 +636,22 @@ def pmc_data_cleanup(in_dict: list[dict]):
 
 def property_data_cleanup(in_dict: list[dict]):
     ret_list = []
-    source_str=''
-    source_flag = False
     for item in in_dict:
         new_dict = {}
         for key, value in item.items():   
-            if source_flag:
-                new_dict['Source'] = source_str
-                source_flag = False
-
             if key == 'DateString':
-                if value is not None:
-                    new_dict['Date'] = parser.parse(value).strftime('%d %b %Y')
-                else:
-                    new_dict['Date'] = None
+                new_dict['Date'] = format_date(value) if value is not None else None
             elif key == 'DueDateString':
-                if value is not None:
-                    new_dict['DueDate'] = parser.parse(value).strftime('%d %b %Y')
-                else:
-                    new_dict['DueDate'] = None
+                new_dict['DueDate'] = format_date(value) if value is not None else None
             elif key == 'Contact':
                 if 'Name' in value:
                     new_dict['Contact'] = value['Name']
                 else:
                     new_dict['Contact'] = None
-                source_flag = True
+                new_dict['Source'] = invoice_sources.get(item.get('Type'), '')
             elif key == 'InvoiceNumber':
-                if value is not None:
-                    new_dict['Reference'] = value
-                else:
-                    new_dict['Reference'] = None
+                new_dict['Reference'] = value
             elif key == 'Type':
-                if value == 'ACCREC':
-                    source_str = 'Recievable Invoice'
-                elif value == 'ACCPAY':
-                    source_str = 'Payable Invoice'
                 continue
             
             ## Will need to adjust these
@@ -553,36 +668,20 @@ def property_data_cleanup(in_dict: list[dict]):
 
 def property_credit_cleanup(in_dict: list[dict]):
     ret_list = []
-    source_str=''
-    source_flag = False
     for item in in_dict:
         new_dict = {}
         for key, value in item.items():   
-            if source_flag:
-                new_dict['Source'] = source_str
-                source_flag = False
-
             if key == 'DateString':
-                if value is not None:
-                    new_dict['Date'] = parser.parse(value).strftime('%d %b %Y')
-                else:
-                    new_dict['Date'] = None
+                new_dict['Date'] = format_date(value) if value is not None else None
             elif key == 'Contact':
                 if 'Name' in value:
                     new_dict['Contact'] = value['Name']
                 else:
                     new_dict['Contact'] = None
-                source_flag = True
+                new_dict['Source'] = credit_sources.get(item.get('Type'), '')
             elif key == 'CreditNoteNumber':
-                if value is not None:
-                    new_dict['Reference'] = value
-                else:
-                    new_dict['Reference'] = None
+                new_dict['Reference'] = value
             elif key == 'Type':
-                if value == 'ACCRECCREDIT':
-                    source_str = 'Recievable Credit Note'
-                elif value == 'ACCPAYCREDIT':
-                    source_str = 'Payable Credit Note'
                 continue
             
             ## Will need to adjust these
@@ -599,33 +698,18 @@ def property_credit_cleanup(in_dict: list[dict]):
 
 def pmc_credit_cleanup(in_dict: list[dict]):
     ret_list = []
-    source_str=''
-    source_flag = False
     for item in in_dict:
         new_dict = {}
         for key, value in item.items():   
-            if source_flag:
-                new_dict['Source'] = source_str
-                source_flag = False
-
             if key == 'DateString':
-                if value is not None:
-                    new_dict['Date'] = parser.parse(value).strftime('%d %b %Y')
-                else:
-                    new_dict['Date'] = None
+                new_dict['Date'] = format_date(value) if value is not None else None
             elif key == 'Contact':
-                source_flag = True
+                new_dict['Source'] = credit_sources.get(item.get('Type'), '')
             elif key == 'CreditNoteNumber':
+                new_dict['Reference'] = value
                 if value is not None:
-                    new_dict['Reference'] = value
                     new_dict['Combined'] = value
-                else:
-                    new_dict['Reference'] = None
             elif key == 'Type':
-                if value == 'ACCRECCREDIT':
-                    source_str = 'Recievable Credit Note'
-                elif value == 'ACCPAYCREDIT':
-                    source_str = 'Payable Credit Note'
                 continue
             
             ## Will need to adjust these
@@ -656,27 +740,35 @@ def create_dir_file(data: List[Dict], filename: str, dir_name: str):
     df.to_csv(filename, index=False)
     print(f"File created: {filename}")
 
-def float_conv(x):
-    if pd.isnull(x):
-        return np.nan
-    elif isinstance(x, str):
-        return float(x.replace(",", ""))
-    else:
-        return float(x)
+def float_column(column: pd.Series) -> pd.Series:
+    """Converts a column to floats, stripping thousands separators from text values"""
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype(float)
+    return pd.to_numeric(column.astype(str).str.replace(',', '', regex=False)).astype(float)
     
+def pull_concurrently(*pulls):
+    """Runs independent Xero pulls on threads so their round trips overlap over
+    the shared session. Results come back in the order the pulls were given."""
+    with ThreadPoolExecutor(max_workers=len(pulls)) as pool:
+        futures = [pool.submit(pull) for pull in pulls]
+        return [future.result() for future in futures]
+
 def pull_all_data(start_date="2025-07-01", end_date="2025-07-02", headers=headers, pull_new_data=True):
         
         if pull_new_data:
-            payments = pull_property_data(start_date=start_date, end_date=end_date, headers=headers, itype='ACCPAY')
+            payments, credit_notes = pull_concurrently(
+                lambda: pull_property_data(start_date=start_date, end_date=end_date, headers=headers, itype='ACCPAY'),
+                lambda: pull_property_credit(start_date=start_date, end_date=end_date, headers=headers, itype='ACCPAYCREDIT'))
             payments = property_data_cleanup(payments)
-            credit_notes = pull_property_credit(start_date=start_date, end_date=end_date, headers=headers, itype='ACCPAYCREDIT')
             credit_notes = property_credit_cleanup(credit_notes)
             payments = payments + credit_notes
             create_file(payments, 'All Property Data.csv')
-            unmatched_df = pd.read_csv('All Property Data.csv')
+            all_df = pd.read_csv('All Property Data.csv')
+            # Rows not yet claimed by a property; first matching property wins
+            unclaimed = pd.Series(True, index=all_df.index)
 
 
-            all_length = len(unmatched_df)
+            all_length = len(all_df)
             sum_length = 0
             for property_name, aliases in property_aliases.items():
                 print(f"Processing property: {property_name}")
@@ -684,24 +776,26 @@ def pull_all_data(start_date="2025-07-01", end_date="2025-07-02", headers=header
                 #    pass
                 #else:
                 #    continue
-                invoices = pull_pmc_data(start_date=start_date, end_date=end_date, headers=headers, itype='ACCREC', contact=property_name)
+                invoices, pmc_credit_notes = pull_concurrently(
+                    lambda: pull_pmc_data(start_date=start_date, end_date=end_date, headers=headers, itype='ACCREC', contact=property_name),
+                    lambda: pull_pmc_credit(start_date=start_date, end_date=end_date, headers=headers, itype='ACCRECCREDIT', contact=property_name))
                 invoices = pmc_data_cleanup(invoices)
-                pmc_credit_notes = pull_pmc_credit(start_date=start_date, end_date=end_date, headers=headers, itype='ACCRECCREDIT', contact=property_name)
                 pmc_credit_notes = pmc_credit_cleanup(pmc_credit_notes)
                 invoices = invoices + pmc_credit_notes
                 create_dir_file(invoices, invoice_file_template%property_name, work_dir_template % property_name)
 
-                # Build regex pattern to match any alias (case-insensitive)
-                #pattern = '|'.join([f"(?i){alias}" for alias in aliases])
-                pattern = '(?i)' + '|'.join(aliases)
-                property_df = unmatched_df[unmatched_df['Reference'].str.contains(pattern, na=False, regex=True)]
+                # Match any alias (case-insensitive)
+                pattern = property_alias_patterns[property_name]
+                claimed = unclaimed & all_df['Reference'].str.contains(pattern, na=False)
+                property_df = all_df[claimed]
 
                 sum_length += len(property_df)
                 create_dir_file(property_df, payment_file_template%property_name , work_dir_template % property_name)
 
-                # Remove matched rows from unmatched_df
-                unmatched_df = unmatched_df.drop(property_df.index)
+                # Mark matched rows instead of copying the remaining frame
+                unclaimed &= ~claimed
 
+            unmatched_df = all_df[unclaimed]
             print(f"Number of unmatched rows: {len(unmatched_df)}")
             create_file(unmatched_df, 'Unmatched Property Data.csv')
 
@@ -710,11 +804,11 @@ def pull_all_data(start_date="2025-07-01", end_date="2025-07-02", headers=header
 
 def overwrite_with_local_files(overwrite: List[str]):
     df = pd.read_csv(overwrite[0])
-    df['Gross'] = df['Gross'].apply(float_conv)
-    df['Balance'] = df['Balance'].apply(float_conv)
+    df['Gross'] = float_column(df['Gross'])
+    df['Balance'] = float_column(df['Balance'])
     invoices = load_table(df, invoice_id_col, invoice_desc_col)
     df = pd.read_csv(overwrite[1])
-    df['Amount'] = df['Amount'].apply(float_conv)
+    df['Amount'] = float_column(df['Amount'])
     df = df[df['Contact'] == 'Parklane Management Company']
     payments = load_table(df, payment_id_col, payment_desc_col) 
     return invoices, payments 
@@ -728,12 +822,12 @@ def compare_property_data(property_name: str, overwrite=False):
     
     # Read csv into df
     df = pd.read_csv(invoice_path_template % (property_name, property_name))
-    df['Gross'] = df['Gross'].apply(float_conv)
-    df['Balance'] = df['Balance'].apply(float_conv)
+    df['Gross'] = float_column(df['Gross'])
+    df['Balance'] = float_column(df['Balance'])
     invoices = load_table(df, invoice_id_col, invoice_desc_col)
 
     df = pd.read_csv(payment_path_template % (property_name, property_name))
-    df['Amount'] = df['Amount'].apply(float_conv)
+    df['Amount'] = float_column(df['Amount'])
     df = df[df['Contact'] == 'Parklane Management Company']
     payments = load_table(df, payment_id_col, payment_desc_col)   
 
@@ -745,14 +839,17 @@ def compare_property_data(property_name: str, overwrite=False):
     output_matches(matches, [inv for inv in unmatched_invoices], [pay for pay in unmatched_payments], output_path=output_path_template % (property_name, property_name))
     return matches, unmatched_invoices, unmatched_payments
 
-def compare_all_data():
+def compare_all_data(max_workers=None):
+    """Compares every property, each in its own process"""
     all_data = {}
-    for property_name, aliases in property_aliases.items():
-        matches, unmatched_invoices, unmatched_payments =  compare_property_data(property_name)
-        all_data['property_name'] = {}
-        all_data['property_name']['matches'] = matches
-        all_data['property_name']['unmatched_invoices'] = unmatched_invoices
-        all_data['property_name']['unmatched_payments'] = unmatched_payments
+    property_names = list(property_aliases)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(compare_property_data, property_names)
+        for property_name, (matches, unmatched_invoices, unmatched_payments) in zip(property_names, results):
+            all_data[property_name] = {}
+            all_data[property_name]['matches'] = matches
+            all_data[property_name]['unmatched_invoices'] = unmatched_invoices
+            all_data[property_name]['unmatched_payments'] = unmatched_payments
 
     return all_data
         
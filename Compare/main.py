@@ -35,13 +35,13 @@ def run_full_pipeline():
         print()
     
         combined_matches, new_matches = find_combination_entries(matches, unmatched_invoices, unmatched_payments)
-        unique_invoice_ids=[]
-        unique_payment_ids=[]
+        unique_invoice_ids=set()
+        unique_payment_ids=set()
         combo_match_len = 0
         for x in combined_matches:
             combo_match_len += x.get_num_records()
-            unique_invoice_ids.extend(x.get_invoice_ids())
-            unique_payment_ids.extend(x.get_payment_ids())
+            unique_invoice_ids.update(x.get_invoice_ids())
+            unique_payment_ids.update(x.get_payment_ids())
         
         new_unmatched_invoices = [i for i in unmatched_invoices if i.id not in unique_invoice_ids]
         new_unmatched_payments = [p for p in unmatched_payments if p.id not in unique_payment_ids]
@@ -1,7 +1,9 @@
 # gmail_watcher.py
 
 import os
+import time
 import base64
+from functools import lru_cache
 import email
 from email.header import decode_header
 from google.auth.transport.requests import Request
@@ -19,7 +21,11 @@ TOKEN_PATH = os.path.join(BASE_DIR, 'token.json')
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly',
           'https://www.googleapis.com/auth/gmail.send']
 
+@lru_cache(maxsize=1)
 def get_gmail_service():
+    """
+    Build the Gmail API client once per process; later calls reuse it.
+    """
     creds = None
     if os.path.exists(TOKEN_PATH):
         creds = Credentials.from_authorized_user_file(TOKEN_PATH, SCOPES)
@@ -36,12 +42,67 @@ def get_gmail_service():
     service = build('gmail', 'v1', credentials=creds)
     return service
 
+# Each messages.get costs 5 quota units, so 10 per batch stays well inside
+# Gmail's per-user limit of 250 units per second
+BATCH_SIZE = 10
+# Gets that are rate limited or hit a server error are retried, doubling the
+# wait each round, before giving up
+MAX_FETCH_RETRIES = 5
+RETRYABLE_STATUSES = {429, 500, 503}
+
 def get_email_body(service, msg_id):
     """
     Fetches and decodes the full raw email using Gmail API and Python's email library.
-    Returns a dict with 'plain' and 'html' keys if available.
+    Returns a dict with the Gmail message 'id' plus 'plain' and 'html' keys if available.
     """
     message = service.users().messages().get(userId='me', id=msg_id, format='raw').execute()
+    return decode_email_body(message)
+
+def get_email_bodies(service, msg_ids):
+    """
+    Fetches and decodes many emails using batched Gmail API requests, so the
+    round trips overlap instead of running one after another.
+    Returns the decoded bodies in the same order as msg_ids. Raises the
+    fetch error if any email still can't be read after retrying, so a missing
+    email is never mistaken for one with no payments.
+    """
+    msg_ids = list(dict.fromkeys(msg_ids))  # batch request ids must be unique
+    bodies = {}
+    failures = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            failures[request_id] = exception
+            return
+        bodies[request_id] = decode_email_body(response)
+
+    pending = msg_ids
+    for attempt in range(MAX_FETCH_RETRIES + 1):
+        failures.clear()
+        for start in range(0, len(pending), BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=collect)
+            for msg_id in pending[start:start + BATCH_SIZE]:
+                batch.add(service.users().messages().get(userId='me', id=msg_id, format='raw'), request_id=msg_id)
+            batch.execute()
+
+        if not failures:
+            break
+        for msg_id, exception in failures.items():
+            status = getattr(getattr(exception, 'resp', None), 'status', None)
+            if status not in RETRYABLE_STATUSES or attempt == MAX_FETCH_RETRIES:
+                print(f"Failed to fetch email {msg_id}: {exception}")
+                raise exception
+        print(f"Retrying {len(failures)} emails after errors...")
+        time.sleep(2 ** attempt)
+        pending = list(failures)
+
+    return [bodies[msg_id] for msg_id in msg_ids]
+
+def decode_email_body(message):
+    """
+    Decodes a raw-format Gmail message resource into a body dict.
+    """
+    msg_id = message['id']
     raw_msg = message['raw']
     msg_bytes = base64.urlsafe_b64decode(raw_msg.encode('ASCII'))
     mime_msg = email.message_from_bytes(msg_bytes)
@@ -50,7 +111,7 @@ def get_email_body(service, msg_id):
     subject = decode_subject(mime_msg['Subject'])
     sender = mime_msg['From']
 
-    body = {"plain": None, "html": None, "subject": subject, "from": sender}
+    body = {"id": msg_id, "plain": None, "html": None, "subject": subject, "from": sender}
 
     if mime_msg.is_multipart():
         for part in mime_msg.walk():
@@ -102,11 +163,8 @@ def fetch_aptexx_emails(start_date=None, end_date=None):
     results = service.users().messages().list(userId='me', q=query).execute()
     messages = results.get('messages', [])
 
-    emails = []
-    for msg in messages:
-        email_body = get_email_body(service, msg['id'])
-        emails.append(email_body)
-    
+    emails = get_email_bodies(service, [msg['id'] for msg in messages])
+
     return emails
 
     return emails
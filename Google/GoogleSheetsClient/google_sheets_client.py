@@ -1,10 +1,14 @@
+import time
 import gspread
 from google.oauth2.service_account import Credentials
 
 class GoogleSheetsClient:
-    def __init__(self, credentials_path='service_account.json'):
+    def __init__(self, credentials_path='service_account.json', cache_ttl=60):
         """
         Initializes Google Sheets client using Service Account credentials.
+
+        :param cache_ttl: Seconds a worksheet read is served from memory before
+            it is fetched again
         """
         scopes = [
             'https://www.googleapis.com/auth/spreadsheets.readonly',
@@ -13,21 +17,56 @@ class GoogleSheetsClient:
         self.credentials = Credentials.from_service_account_file(
             credentials_path, scopes=scopes)
         self.client = gspread.authorize(self.credentials)
+        self.cache_ttl = cache_ttl
+        # Opening a spreadsheet is a metadata round trip of its own, so keep the
+        # handles, and recent worksheet reads keyed on (sheet, worksheet name)
+        self._spreadsheets = {}
+        self._reads = {}
 
-    def read_sheet_as_lists(self, sheet_url_or_key, worksheet_name=None):
+    def open_sheet(self, sheet_url_or_key):
+        """
+        Opens a Google Sheet by URL or key, reusing the handle on later calls.
+        """
+        sheet = self._spreadsheets.get(sheet_url_or_key)
+        if sheet is None:
+            sheet = self.client.open_by_url(sheet_url_or_key) if sheet_url_or_key.startswith('http') \
+                else self.client.open_by_key(sheet_url_or_key)
+            self._spreadsheets[sheet_url_or_key] = sheet
+        return sheet
+
+    def read_sheet_as_lists(self, sheet_url_or_key, worksheet_name=None, refresh=False):
         """
         Reads a Google Sheet and returns data as a list of rows.
 
         :param sheet_url_or_key: The full URL or key of the Google Sheet
         :param worksheet_name: Optional specific worksheet to read
+        :param refresh: Fetch from the API even if a recent read is cached
         :return: List of rows, each row is a list of cell values
         """
-        sheet = self.client.open_by_url(sheet_url_or_key) if sheet_url_or_key.startswith('http') \
-            else self.client.open_by_key(sheet_url_or_key)
+        key = (sheet_url_or_key, worksheet_name)
+        cached = self._reads.get(key)
+        if not refresh and cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            data = cached[1]
+        else:
+            sheet = self.open_sheet(sheet_url_or_key)
+            worksheet = sheet.worksheet(worksheet_name) if worksheet_name else sheet.sheet1
+            data = worksheet.get_all_values()
+            self._reads[key] = (time.monotonic(), data)
+
+        # Copy the rows so callers can't modify the cached read
+        return [row[:] for row in data]
 
-        worksheet = sheet.worksheet(worksheet_name) if worksheet_name else sheet.sheet1
-        data = worksheet.get_all_values()
-        return data
+    def read_many(self, sheet_url_or_key, ranges):
+        """
+        Reads several ranges of a Google Sheet in a single API call.
+
+        :param sheet_url_or_key: The full URL or key of the Google Sheet
+        :param ranges: A1 ranges to read, e.g. ["Sheet1!A1:D", "Rents!A:C"]
+        :return: List with the rows of each range, in the order given
+        """
+        sheet = self.open_sheet(sheet_url_or_key)
+        response = sheet.values_batch_get(ranges)
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
 
     def read_sheet_as_dataframe(self, sheet_url_or_key, worksheet_name=None):
         """
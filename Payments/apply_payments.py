@@ -1,5 +1,5 @@
 from XeroClient.xero_client import apply_payment
-from Payments.payments_db import get_payments_by_invoice
+from Payments.payments_db import get_payments_by_invoices
 
 
 
@@ -62,12 +62,8 @@ def match_and_apply_payments(aptexx_payment, tenant_invoices):
 
     else:
         ## Check to see if payment is already applied to an invoice
-        already_paid= False
-        for invoice in tenant_invoices:
-            payments = get_payments_by_invoice(invoice['invoice_id'])
-            for payment in payments:
-                if payment['reference'].count(aptexx_payment['ref']) > 0:
-                    already_paid = True
+        payments = get_payments_by_invoices(invoice['invoice_id'] for invoice in tenant_invoices)
+        already_paid = any(aptexx_payment['ref'] in (payment['reference'] or '') for payment in payments)
         if already_paid:
             print(f"  Payment {aptexx_payment['ref']} already applied to an invoice.")
             print()
@@ -1,21 +1,17 @@
 # main.py
 import sys
 import os
-from bs4 import BeautifulSoup
 
-
-# Add parent directory to path for xero_client import
+# Add parent directory to path so the project packages resolve when run as a script
 PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PARENT_DIR not in sys.path:
     sys.path.insert(0, PARENT_DIR)
 
-
-from XeroClient.xero_client import pull_tenant_invoices
 from Google.GmailClient.gmail_watcher import fetch_aptexx_emails
 from Google.GmailClient.gmail_sender import send_email
-from parser import parse_html_payments
-from apply_payments import match_and_apply_payments
-from Payments.payments_db import get_invoices_by_contact
+from Payments.parser import parse_html_payments
+from Payments.apply_payments import match_and_apply_payments
+from Payments.payments_db import get_invoices_by_contacts
 from Payments.refresh_invoices import refresh_invoice_cache
 
 def build_html_email(payments):
@@ -59,14 +55,39 @@ def build_html_email(payments):
 def process_payments(start_date=None, end_date=None):
     # Step 1. Fetch AptExx emails
     emails = fetch_aptexx_emails(start_date=start_date, end_date=end_date)
-    
+
+    # Refs already handled in this run, so a payment listed in more than one
+    # summary is never applied twice. Emails themselves arrive deduplicated
+    seen_refs = set()
+    email_payments = []
     for email in emails:
-        if email['html']:
-            parsed_payments = parse_html_payments(email['html'])
-        else:
+        # Only the HTML part carries the payment table; the plain-text part
+        # has no <tr> rows for parse_html_payments to read
+        html = email.get('html')
+        if not html:
             print("No usable email content found.")
-
+            continue
+        parsed_payments = parse_html_payments(html)
+        # The email's total covers every row, including repeats skipped below
         total_amount = sum(payment['amount'] for payment in parsed_payments)
+
+        # Mark each ref as it is taken so a repeat within the same email is
+        # skipped too, not just repeats from earlier emails
+        new_payments = []
+        for payment in parsed_payments:
+            if payment['ref'] in seen_refs:
+                continue
+            seen_refs.add(payment['ref'])
+            # Normalize the tenant name once; it is the invoice lookup key
+            payment['contact'] = " ".join(payment['person'].split())
+            new_payments.append(payment)
+        email_payments.append((total_amount, new_payments))
+
+    # Look up every tenant across all emails in one batch instead of per payment
+    contacts = {payment['contact'] for _, parsed_payments in email_payments for payment in parsed_payments}
+    invoices_by_contact = get_invoices_by_contacts(contacts)
+
+    for total_amount, parsed_payments in email_payments:
         missed_payments=[]
         for payment in parsed_payments:
             print(f"Processing AptExx payment: {payment['ref']} on {payment['date']} for amount {payment['amount']}")
@@ -78,8 +99,7 @@ def process_payments(start_date=None, end_date=None):
                 continue
 
             # Step 2. Get tenant invoices from Xero
-            contact = " ".join(x for x in payment['person'].split() if x !='')
-            tenant_invoices = get_invoices_by_contact(contact)
+            tenant_invoices = invoices_by_contact.get(payment['contact'], [])
             if not tenant_invoices:
                 print(f"No invoices found for tenant: {payment['person']}. SEND EMAIL")
                 print()
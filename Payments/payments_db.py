@@ -1,21 +1,37 @@
 import sqlite3
+import threading
+from functools import lru_cache
 
 DB_NAME = '/tmp/payments.db'
 
+_local = threading.local()
+
+def get_connection():
+    """
+    Return this thread's shared connection to the local SQLite db, opening it
+    (in WAL mode) on first use so callers don't pay connect/close per query.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_NAME)
+        conn.execute('PRAGMA journal_mode=WAL')
+        _local.conn = conn
+    return conn
+
 def reset_db():
     """
     Reset the local SQLite database by dropping the invoices table if it exists.
     """
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute('DROP TABLE IF EXISTS invoices')
     c.execute('DROP TABLE IF EXISTS payments')
     conn.commit()
-    conn.close()
+    _payments_by_invoices.cache_clear()
     init_db()
 
 def init_db():
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute('''
         CREATE TABLE IF NOT EXISTS invoices (
@@ -41,13 +57,12 @@ def init_db():
         )
     ''')
     conn.commit()
-    conn.close()
 
 def upsert_invoices(invoices):
     """
     Insert or update multiple invoices into the local SQLite db.
     """
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     for inv in invoices:
         if inv['Payments']:
@@ -89,74 +104,127 @@ def upsert_invoices(invoices):
                 payment.get('Status'),
             ))
     conn.commit()
-    conn.close()
+    _payments_by_invoices.cache_clear()
 
 def get_invoices_by_contact(contact_substring):
     """
     Query invoices by a substring of the contact name (case-insensitive).
     Returns a list of dictionaries using column names as keys.
     """
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # Enable dict-like access
+    conn = get_connection()
     c = conn.cursor()
+    c.row_factory = sqlite3.Row  # Enable dict-like access
     c.execute('''
         SELECT * FROM invoices
         WHERE lower(contact_name) LIKE ?
     ''', ('%' + contact_substring.lower() + '%',))
     rows = c.fetchall()
-    conn.close()
 
     # Convert sqlite3.Row objects to dictionaries
     results = [dict(row) for row in rows]
     return results
 
+def get_invoices_by_contacts(contact_substrings):
+    """
+    Batch version of get_invoices_by_contact for every tenant in a payments run.
+    Runs every lookup over a single connection and returns a dict of
+    {contact_substring: [invoice dicts]}.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.row_factory = sqlite3.Row  # Enable dict-like access
+    results = {}
+    for contact_substring in contact_substrings:
+        c.execute('''
+            SELECT * FROM invoices
+            WHERE lower(contact_name) LIKE ?
+        ''', ('%' + contact_substring.lower() + '%',))
+        results[contact_substring] = [dict(row) for row in c.fetchall()]
+    return results
 
 def get_invoices_by_unit(unit_substring):
     """
     Query invoices by a substring of the unit reference (case-insensitive).
     """
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute('''
         SELECT * FROM invoices
         WHERE lower(reference) LIKE ?
     ''', ('%' + unit_substring.lower() + '%',))
     rows = c.fetchall()
-    conn.close()
     return rows
 
 def get_all_invoices():
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute('SELECT * FROM invoices')
     rows = c.fetchall()
-    conn.close()
     return rows
 
 def get_payments_by_invoice(invoice_id):
     """
     Get all payments associated with a specific invoice ID.
     """
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # Enable dict-like access
+    conn = get_connection()
     c = conn.cursor()
+    c.row_factory = sqlite3.Row  # Enable dict-like access
     c.execute('SELECT * FROM payments WHERE invoice_id = ?', (invoice_id,))
     rows = c.fetchall()
     payments = [dict(row) for row in rows]  # Convert to list of dicts
-    conn.close()
     return payments
 
+def get_payments_by_invoices(invoice_ids):
+    """
+    Get all payments for a set of invoice IDs in one query.
+    Results are cached until the payments table is next written.
+    """
+    payments = _payments_by_invoices(tuple(sorted(set(invoice_ids))))
+    return [dict(payment) for payment in payments]
+
+@lru_cache(maxsize=8192)
+def _payments_by_invoices(invoice_ids):
+    if not invoice_ids:
+        return ()
+    conn = get_connection()
+    c = conn.cursor()
+    c.row_factory = sqlite3.Row  # Enable dict-like access
+    placeholders = ', '.join('?' for _ in invoice_ids)
+    c.execute(f'SELECT * FROM payments WHERE invoice_id IN ({placeholders})', invoice_ids)
+    return tuple(dict(row) for row in c.fetchall())
+
 def get_all_payments():
     """
     Get all payments from the database.
     """
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_connection()
     c = conn.cursor()
     c.execute('SELECT * FROM payments')
     rows = c.fetchall()
-    conn.close()
     return rows
 
+def get_database_stats():
+    """
+    Return invoice and payment counts plus the outstanding balance in a
+    single round trip.
+    """
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM invoices),
+            (SELECT COUNT(*) FROM payments),
+            (SELECT COUNT(*) FROM invoices WHERE status != 'PAID'),
+            (SELECT COALESCE(SUM(amount_due), 0) FROM invoices WHERE status != 'PAID' AND amount_due > 0)
+    ''')
+    invoices, payments, open_invoices, amount_outstanding = c.fetchone()
+    return {
+        'invoices': invoices,
+        'payments': payments,
+        'open_invoices': open_invoices,
+        'amount_outstanding': amount_outstanding,
+    }
+
 if __name__ == "__main__":
     
     reset_db()
@@ -164,15 +232,14 @@ if __name__ == "__main__":
     print("Database initialized.")
     
     # Example usage
-    invoices = get_all_invoices()
-    if invoices:
-        print(f"Found {len(invoices)} invoices in the database.")
+    stats = get_database_stats()
+    if stats['invoices']:
+        print(f"Found {stats['invoices']} invoices in the database.")
     else:
         print("No invoices found in the database.")
 
-    payments = get_all_payments()
-    if payments:
-        print(f"Found {len(payments)} payments in the database.")
+    if stats['payments']:
+        print(f"Found {stats['payments']} payments in the database.")
     else:
         print("No payments found in the database.")
     
@@ -1,7 +1,6 @@
 from flask import Flask, redirect, request
-import requests
 import json
-from xero_client import save_tokens
+from xero_client import save_tokens, session
 
 app = Flask(__name__)
 
@@ -35,7 +34,7 @@ def callback():
     }
     auth = (CLIENT_ID, CLIENT_SECRET)
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(token_url, data=data, auth=auth, headers=headers)
+    response = session.post(token_url, data=data, auth=auth, headers=headers)
 
     if response.status_code != 200:
         return f"Token exchange failed: {response.text}"
@@ -46,4 +45,4 @@ def callback():
     return "Authorization complete. Tokens saved. You can now call your data pull script."
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=10000, debug=True)
+    app.run(host="0.0.0.0", port=10000)
@@ -1,9 +1,23 @@
-import requests, json, os, re
+import requests, json, os, re, time, threading
 from datetime import datetime, timedelta, timezone
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 token_path = os.path.join(base_dir, 'xero_tokens.json')
 
+# Shared session so every call to identity.xero.com / api.xero.com reuses
+# pooled keep-alive connections instead of a fresh TCP+TLS handshake.
+session = requests.Session()
+
+# Tokens currently in use and tenant ids per organisation, so authorize_xero
+# only touches the token file and identity.xero.com once the access token is
+# about to expire instead of on every call.
+_token_cache = {}
+_tenant_cache = {}
+token_expiry_margin = 60  # seconds
+# Pulls run on threads; only one of them may refresh, since Xero rotates the
+# refresh token on every use.
+_token_lock = threading.Lock()
+
 ## If xero_secrets is deleted, must recreate with new client_id and client_secret
 def load_xero_credentials(filename='xero_secrets.json') -> dict:
     """
@@ -52,7 +66,7 @@ def get_invoices_for_db(access_token, tenant_id, start_date, end_date, page=1):
         'where': f'Date >= DateTime({start_date}) && Date <= DateTime({end_date})',
         'page': page
     }
-    response = requests.get(url, headers=headers, params=params)
+    response = session.get(url, headers=headers, params=params)
     response.raise_for_status()
     return response.json().get('Invoices', [])
 
@@ -60,8 +74,14 @@ def get_invoices_for_db(access_token, tenant_id, start_date, end_date, page=1):
 # Save tokens
 # ------------------------------------------
 def save_tokens(tokens):
+    if 'expires_in' in tokens and 'expires_at' not in tokens:
+        tokens['expires_at'] = time.time() + tokens['expires_in']
     with open(token_path, 'w') as f:
         json.dump(tokens, f)
+    _token_cache['tokens'] = tokens
+
+def access_token_valid(tokens):
+    return bool(tokens) and tokens.get('expires_at', 0) > time.time() + token_expiry_margin
 
 # ------------------------------------------
 # Refresh access token if expired
@@ -79,7 +99,7 @@ def refresh_access_token(tokens):
     auth = (client_id, client_secret)
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    response = requests.post(token_url, data=data, auth=auth, headers=headers)
+    response = session.post(token_url, data=data, auth=auth, headers=headers)
     if response.status_code == 200:
         new_tokens = response.json()
         save_tokens(new_tokens)
@@ -92,7 +112,7 @@ def refresh_access_token(tokens):
 # Get tenant ID
 # ------------------------------------------
 def get_tenant_id(access_token):
-    response = requests.get(
+    response = session.get(
         "https://api.xero.com/connections",
         headers={"Authorization": f"Bearer {access_token}"}
     )
@@ -106,6 +126,32 @@ def get_tenant_id(access_token):
 # ------------------------------------------
 # Get invoices
 # ------------------------------------------
+# Xero returns at most this many records per page
+xero_page_size = 100
+
+def get_all_pages(url, key, access_token, tenant_id, params):
+    """
+    Fetch every page of a Xero collection, stopping at the first short page.
+    Returns None if any page fails so callers never see a partial list.
+    """
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/json",
+        "Xero-tenant-id": tenant_id,
+    }
+    items = []
+    page = 1
+    while True:
+        response = session.get(url, headers=headers, params={**params, 'page': page})
+        if response.status_code != 200:
+            print(f"Failed to get {key} page {page}:", response.status_code, response.text)
+            return None
+        batch = response.json().get(key, [])
+        items.extend(batch)
+        if len(batch) < xero_page_size:
+            return items
+        page += 1
+
 def get_invoices(access_token, tenant_id, start_date, end_date, itype, contact=None):
     param_str = f'Date >= DateTime({start_date.replace("-", ", ")}) && Date <= DateTime({end_date.replace("-", ", ")}) && Status != "DELETED" && Status != "VOIDED"'
     if itype!=None:
@@ -115,20 +161,8 @@ def get_invoices(access_token, tenant_id, start_date, end_date, itype, contact=N
     params = {
         'where': param_str,
     }
-    response = requests.get(
-        "https://api.xero.com/api.xro/2.0/Invoices",
-        headers={
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Xero-tenant-id": tenant_id,
-        },
-        params=params
-    )
-    if response.status_code == 200:
-        return response.json()["Invoices"]
-    else:
-        print("Failed to get invoices:", response.text)
-        return []
+    invoices = get_all_pages("https://api.xero.com/api.xro/2.0/Invoices", "Invoices", access_token, tenant_id, params)
+    return invoices if invoices is not None else []
 
 # ------------------------------------------
 # Get payments (with filter example)
@@ -137,20 +171,8 @@ def get_payments(access_token, tenant_id, start_date):
     params = {
         'where': f'Date >= DateTime({start_date.replace("-", ", ")})'
     }
-    response = requests.get(
-        "https://api.xero.com/api.xro/2.0/Payments",
-        headers={
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Xero-tenant-id": tenant_id,
-        },
-        params=params
-    )
-    if response.status_code == 200:
-        return response.json()["Payments"]
-    else:
-        print("Failed to get payments:", response.text)
-        return []
+    payments = get_all_pages("https://api.xero.com/api.xro/2.0/Payments", "Payments", access_token, tenant_id, params)
+    return payments if payments is not None else []
     
 import requests
 
@@ -170,21 +192,8 @@ def get_creditnotes(access_token, tenant_id, start_date, end_date, itype, contac
         'where': param_str,
     }
 
-    response = requests.get(
-        "https://api.xero.com/api.xro/2.0/CreditNotes",
-        headers={
-            "Authorization": f"Bearer {access_token}",
-            "Accept": "application/json",
-            "Xero-tenant-id": tenant_id,
-        },
-        params=params
-    )
-
-    if response.status_code == 200:
-        return response.json().get("CreditNotes", [])
-    else:
-        print("Failed to get credit notes:", response.status_code, response.text)
-        return []
+    credit_notes = get_all_pages("https://api.xero.com/api.xro/2.0/CreditNotes", "CreditNotes", access_token, tenant_id, params)
+    return credit_notes if credit_notes is not None else []
     
 ## Will definitely need to be gone over, do not trust yet
 def pull_tenant_invoices(start_date=None, end_date=None, itype=None, contact=None):
@@ -195,10 +204,11 @@ def pull_tenant_invoices(start_date=None, end_date=None, itype=None, contact=Non
     access_token, tenant_id = authorize_xero(org_name="Parklane Properties")
 
     # Default date range to last 30 days if not provided
+    now = datetime.now()
     if not start_date:
-        start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+        start_date = (now - timedelta(days=30)).strftime('%Y-%m-%d')
     if not end_date:
-        end_date = datetime.now().strftime('%Y-%m-%d')
+        end_date = now.strftime('%Y-%m-%d')
 
     invoices = get_invoices(access_token, tenant_id, start_date, end_date, itype, contact=contact)
     
@@ -237,7 +247,13 @@ def format_dates(invoices):
                     payment['UpdatedDateUTC'] = parse_xero_date(payment['UpdatedDateUTC'])
     return invoices
 
-def get_xero_accounts(access_token: str, tenant_id: str):
+# Active accounts per tenant. The chart of accounts doesn't change during a
+# payments run, so apply_payment shouldn't refetch it for every payment.
+_accounts_cache = {}
+
+def get_xero_accounts(access_token: str, tenant_id: str, refresh: bool = False):
+    if not refresh and tenant_id in _accounts_cache:
+        return _accounts_cache[tenant_id]
 
     params = {
         'where': 'Status=="ACTIVE"',
@@ -250,10 +266,12 @@ def get_xero_accounts(access_token: str, tenant_id: str):
         "Accept": "application/json"
     }
 
-    response = requests.get(url, headers=headers, params=params)
+    response = session.get(url, headers=headers, params=params)
     response.raise_for_status()
 
-    return response.json()["Accounts"]
+    accounts = response.json()["Accounts"]
+    _accounts_cache[tenant_id] = accounts
+    return accounts
 
 def get_bank_info(access_token, tenant_id, payment_data):
     ret_list = []
@@ -330,30 +348,34 @@ def apply_payment(payment_data):
         'Content-Type': 'application/json'
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    response = session.post(url, headers=headers, json=data)
     response.raise_for_status()
     return response.json()
     #return None
 
 def authorize_xero(org_name="Test"):
-    tokens = load_tokens()
-    if not tokens:
-        print("No tokens saved. Run the Flask server to authorize first.")
-        return None
+    with _token_lock:
+        tokens = _token_cache.get('tokens')
+        if not access_token_valid(tokens):
+            # Re-read the file in case the Flask server saved newer tokens
+            tokens = load_tokens()
+            if not tokens:
+                print("No tokens saved. Run the Flask server to authorize first.")
+                return None
 
-    access_token = tokens["access_token"]
+            if not access_token_valid(tokens):
+                tokens = refresh_access_token(tokens)
+                if not tokens:
+                    print("Could not refresh token. Re-authorize via Flask server.")
+                    return None
+            _token_cache['tokens'] = tokens
 
-    # Optional: implement expiry check if you store expiry timestamps
-    tokens = refresh_access_token(tokens)
-    if tokens:
-        access_token = tokens["access_token"]
-    else:
-        print("Could not refresh token. Re-authorize via Flask server.")
-        return None
+    access_token = tokens["access_token"]
 
-    tenant_id = get_tenant_id_by_name(access_token,org_name)
+    tenant_id = _tenant_cache.get(org_name) or get_tenant_id_by_name(access_token,org_name)
     if not tenant_id:
         return None
+    _tenant_cache[org_name] = tenant_id
     
     print("Authorization successful. Access token and tenant ID obtained.")
     return access_token, tenant_id
@@ -362,7 +384,7 @@ def authorize_xero(org_name="Test"):
 # ------------------------------------------
 
 def get_tenant_id_by_name(access_token, target_name):
-    response = requests.get(
+    response = session.get(
         "https://api.xero.com/connections",
         headers={"Authorization": f"Bearer {access_token}"}
     )
@@ -1,38 +1,59 @@
 import os
 import re
 
-def resolve_imports(file_path, project_dir, processed_files):
+# Regex to match import statements
+import_pattern = re.compile(r"^(?:from\s+([\w\.]+)\s+import|import\s+([\w\.]+))")
+
+def resolve_imports(file_path, project_dir, processed_files, out):
     """
-    Recursively resolve imports and include the code from imported files.
+    Recursively resolve imports and write the code from imported files to out.
     """
-    code = ""
     try:
-        with open(file_path, "r") as f:
-            lines = f.readlines()
-        
-        code += "".join(lines)
+        # Collect the source and its imports in a single pass over the lines
+        lines = []
         imports = []
+        with open(file_path, "r") as f:
+            for line in f:
+                lines.append(line)
+                match = import_pattern.match(line)
+                if match:
+                    module = match.group(1) or match.group(2)
+                    imports.append(module.split(".")[0])  # Get the top-level module name
 
-        # Regex to match import statements
-        import_pattern = re.compile(r"^(?:from\s+([\w\.]+)\s+import|import\s+([\w\.]+))")
-        
-        for line in lines:
-            match = import_pattern.match(line)
-            if match:
-                module = match.group(1) or match.group(2)
-                imports.append(module.split(".")[0])  # Get the top-level module name
+        out.writelines(lines)
 
         for module in imports:
             # Resolve the module to a file path
             module_path = os.path.join(project_dir, module.replace(".", "/") + ".py")
             if os.path.exists(module_path) and module_path not in processed_files:
                 processed_files.add(module_path)
-                code += f"\n# Imported from {module_path}\n"
-                code += resolve_imports(module_path, project_dir, processed_files)
+                out.write(f"\n# Imported from {module_path}\n")
+                resolve_imports(module_path, project_dir, processed_files, out)
     except Exception as e:
-        code += f"\n# Error reading file {file_path}: {e}\n"
+        out.write(f"\n# Error reading file {file_path}: {e}\n")
+
+
+def walk_python_files(directory):
+    """
+    Yield the .py files under directory in os.walk order, using the file type
+    scandir already knows instead of a stat per entry.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return
+
+    subdirs = []
+    for entry in entries:
+        if entry.is_dir():
+            if not entry.is_symlink():
+                subdirs.append(entry.path)
+        elif entry.name.endswith(".py"):  # Only process Python files
+            yield entry.path
 
-    return code
+    for subdir in subdirs:
+        yield from walk_python_files(subdir)
 
 
 def generate_code_summary_with_imports(output_file="code_summary.txt"):
@@ -42,17 +63,14 @@ def generate_code_summary_with_imports(output_file="code_summary.txt"):
     project_dir = os.getcwd()
     processed_files = set()
 
-    with open(output_file, "w") as summary_file:
-        for root, _, files in os.walk(project_dir):
-            for file in files:
-                if file.endswith(".py"):  # Only process Python files
-                    file_path = os.path.join(root, file)
-                    if file_path not in processed_files:
-                        processed_files.add(file_path)
-                        summary_file.write(f"File: {file_path}\n")
-                        summary_file.write("-" * 80 + "\n")
-                        summary_file.write(resolve_imports(file_path, project_dir, processed_files))
-                        summary_file.write("\n" + "=" * 80 + "\n\n")
+    with open(output_file, "w", buffering=1 << 20) as summary_file:
+        for file_path in walk_python_files(project_dir):
+            if file_path not in processed_files:
+                processed_files.add(file_path)
+                summary_file.write(f"File: {file_path}\n")
+                summary_file.write("-" * 80 + "\n")
+                resolve_imports(file_path, project_dir, processed_files, summary_file)
+                summary_file.write("\n" + "=" * 80 + "\n\n")
 
     print(f"Code summary with imports generated in {output_file}")
 